@@ -1,3 +1,4 @@
+from operator import itemgetter
 from typing import Dict, List, Optional, Set, Tuple, Any
 import networkx as nx
 from networkx import Graph
@@ -238,7 +239,7 @@ class GraphService:
         key: str
         data: dict
         # First get all edges and sort them by key
-        sorted_edges = sorted(context.graph.graph.edges(data=True, keys=True), key=lambda x: x[2])  # x[2] is the key
+        sorted_edges = sorted(context.graph.graph.edges(data=True, keys=True), key=itemgetter(2))  # index 2 is the key
 
         edges_data = []
 
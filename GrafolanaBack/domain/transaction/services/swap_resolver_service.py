@@ -1,4 +1,5 @@
 import networkx as nx
+from collections import defaultdict
 from typing import Dict, List, Optional, Set, Tuple, Any
 
 from GrafolanaBack.domain.transaction.models.account import AccountVertex
@@ -9,6 +10,10 @@ from GrafolanaBack.domain.transaction.repositories.account_repository import Acc
 from GrafolanaBack.domain.logging.logging import logger
 from GrafolanaBack.domain.transaction.services.graph_builder_service import GraphBuilderService
 
+# Enum members compared against every edge in the hot loops
+_SWAP_INCOMING = TransferType.SWAP_INCOMING
+_SWAP_OUTGOING = TransferType.SWAP_OUTGOING
+
 class SwapResolverService:
     """
     Service for resolving swap paths in transaction graphs.
@@ -19,6 +24,7 @@ class SwapResolverService:
 
     def __init__(self, accountRepository: AccountRepository):
         self.accountRepository = accountRepository
+        self._pools_marked: Set[str] = set()
     
     def resolve_swap_paths(self, transaction_context: TransactionContext) -> None:
         """
@@ -32,21 +38,25 @@ class SwapResolverService:
         """
         """Resolve swap paths in the transaction graph."""
 
-        failed_swaps: List[int] = []
+        failed_swaps: Set[int] = set()
+
+        # Split swaps between normal and router swaps in a single pass
+        normal_swaps: List[Swap] = []
+        router_swaps: List[Swap] = []
+        for swap in transaction_context.swaps:
+            (router_swaps if swap.router else normal_swaps).append(swap)
 
         # For each swap, find paths between accounts
         swap: Swap
         # First resolve all swaps that are not router swaps
-        for swap in transaction_context.swaps:
-            if not swap.router:
-                if not self.resolve_swap(transaction_context, swap):
-                    failed_swaps.append(swap.id)
+        for swap in normal_swaps:
+            if not self.resolve_swap(transaction_context, swap):
+                failed_swaps.add(swap.id)
         
         # Then resolve all router swaps using the path resolved from normal swaps
-        for swap in transaction_context.swaps:
-            if swap.router:
-                if not self.resolve_router_swap_paths(transaction_context, swap):
-                    failed_swaps.append(swap.id)
+        for swap in router_swaps:
+            if not self.resolve_router_swap_paths(transaction_context, swap):
+                failed_swaps.add(swap.id)
         
         # Remove failed swaps from the transaction context
         transaction_context.swaps = [swap for swap in transaction_context.swaps if swap.id not in failed_swaps] 
@@ -65,43 +75,24 @@ class SwapResolverService:
             transaction_context: The transaction context containing the graph
             router_swap: The router_swap swap operation to resolve
         """
-        subgraph = transaction_context.graph.create_subgraph_for_swap(router_swap)
-        if subgraph is None:
-            logger.error(f"No subgraph found for router swap {router_swap.id}, tx: {transaction_context.transaction_signature}")
-            return False
-
         # Find first link of type SWAP_INCOMING by selecting min key
         # and then the first link of type SWAP_OUTGOING by selecting max key
         # This is done to find the first and last transfer in the swap
         # and to calculate the amount_in and amount_out
         # So we can add the virtual program account and the two edges
-        
-        # Get all edges with data and filter by transfer_type
-        all_edges: List[Tuple[AccountVertex, AccountVertex, int, Dict[str, Any]]] = list(subgraph.edges(data=True, keys=True))
-        
-        if not all_edges:
-            logger.error(f"No edges found in subgraph for router swap {router_swap.id}, tx: {transaction_context.transaction_signature}")
-            return False
-        
-        # Filter for SWAP_INCOMING edges and find the one with minimum key
-        incoming_edges = [(u, v, k, data) for u, v, k, data in all_edges 
-                         if data.get("transfer_type") == TransferType.SWAP_INCOMING]
-        if not incoming_edges:
+        swap_incoming_edge, swap_outgoing_edge = self._find_router_boundary_edges(transaction_context.graph, router_swap.id)
+
+        if swap_incoming_edge is None:
             logger.warning(f"No SWAP_INCOMING edges found for router swap {router_swap.id} transaction {transaction_context.transaction_signature}")
             return False
         
-        swap_incoming_edge = min(incoming_edges, key=lambda edge: int(edge[2]))
         incoming_source, incoming_target, incoming_key, incoming_data = swap_incoming_edge
         amount_in = incoming_data["amount_source"]  # Use the proper field from the edge data
         
-        # Filter for SWAP_OUTGOING edges and find the one with maximum key
-        outgoing_edges = [(u, v, k, data) for u, v, k, data in all_edges 
-                         if data.get("transfer_type") == TransferType.SWAP_OUTGOING]
-        if not outgoing_edges:
+        if swap_outgoing_edge is None:
             logger.warning(f"No SWAP_OUTGOING edges found for router swap {router_swap.id}")
             return False
         
-        swap_outgoing_edge = max(outgoing_edges, key=lambda edge: int(edge[2]))
         outgoing_source, outgoing_target, outgoing_key, outgoing_data = swap_outgoing_edge
         amount_out = outgoing_data["amount_destination"]  # Use the proper field from the edge data
 
@@ -166,16 +157,21 @@ class SwapResolverService:
         """
 
         subgraph = transaction_context.graph.create_subgraph_for_swap(swap)
+
+        # Index the subgraph's vertices by address once
+        vertices_by_address: Dict[str, List[AccountVertex]] = defaultdict(list)
+        for vertex in subgraph.nodes():
+            vertices_by_address[vertex.address].append(vertex)
         
         # Get all vertices with the relevant addresses
-        user_source_vertices = [v for v in subgraph.nodes() if v.address == swap.get_user_source()]
-        user_dest_vertices = [v for v in subgraph.nodes() if v.address == swap.get_user_destination()]
+        user_source_vertices = vertices_by_address.get(swap.get_user_source(), [])
+        user_dest_vertices = vertices_by_address.get(swap.get_user_destination(), [])
         
         # Find the best source and destination vertices
         # Usually the earliest version for source (before swap happens) and 
         # latest version for destination (after swap completes)
-        user_source_vertex: AccountVertex = min(user_source_vertices, key=lambda v: v.version) if user_source_vertices else None
-        user_dest_vertex: AccountVertex = max(user_dest_vertices, key=lambda v: v.version) if user_dest_vertices else None
+        user_source_vertex: AccountVertex = self._earliest_vertex(user_source_vertices)
+        user_dest_vertex: AccountVertex = self._latest_vertex(user_dest_vertices)
         if (user_source_vertex is None) or (user_dest_vertex is None):
             logger.error(f"user vertices not found for swap {swap.id}, source: {user_source_vertex.address}, destination: {user_dest_vertex.address}, tx: {transaction_context.transaction_signature}")
             return False
@@ -183,28 +179,43 @@ class SwapResolverService:
         swap_pools : List[AccountVertex]= []
         # If pools are stored as source/destination
         if isinstance(swap.pool_addresses, TransferAccountAddresses):
-            swap_pools.extend([v for v in subgraph.nodes() if v.address == swap.pool_addresses.destination])
-            swap_pools.extend([v for v in subgraph.nodes() if v.address == swap.pool_addresses.source])
+            swap_pools.extend(vertices_by_address.get(swap.pool_addresses.destination, []))
+            swap_pools.extend(vertices_by_address.get(swap.pool_addresses.source, []))
         # If pools are stored as a list of pools
         else:
-            swap_pools = [v for v in subgraph.nodes() if v.address in swap.pool_addresses]
+            # Keep subgraph node order so ties on version resolve to the same pool
+            pool_addresses = set(swap.pool_addresses)
+            swap_pools = [v for v in subgraph.nodes() if v.address in pool_addresses]
         # Search through list of pool's addresses for paths:
         #  - from user_source 
         #  - to user_destination
-        pool_dest_vertices = []
-        pool_source_vertices = []
-        
         # Might not be perfect..
+        # Set is_pool to True for all pools in the mapping, skipping addresses already marked
+        pools_marked = self._pools_marked
+        accounts = self.accountRepository.accounts
         for pool in swap_pools:
-            # Set is_pool to True for all pools in the mapping
-            self.accountRepository.accounts.get(pool.address).is_pool = True
-            if nx.has_path(subgraph,user_source_vertex, pool):
-                pool_dest_vertices.append(pool)
-            if nx.has_path(subgraph,pool, user_dest_vertex):
-                pool_source_vertices.append(pool)
-
-        pool_dest_vertex: AccountVertex = max(pool_dest_vertices, key=lambda v: v.version) if pool_dest_vertices else None
-        pool_source_vertex: AccountVertex = min(pool_source_vertices, key=lambda v: v.version) if pool_source_vertices else None
+            address = pool.address
+            if address not in pools_marked:
+                account = accounts.get(address)
+                if account is not None:
+                    account.is_pool = True
+                pools_marked.add(address)
+
+        # Compute reachability once instead of running a search per pool
+        reachable_from_source = nx.descendants(subgraph, user_source_vertex)
+        reachable_from_source.add(user_source_vertex)
+        reaching_dest = nx.ancestors(subgraph, user_dest_vertex)
+        reaching_dest.add(user_dest_vertex)
+
+        # In one pass keep the latest pool reachable from the user source
+        # and the earliest pool reaching the user destination
+        pool_dest_vertex: AccountVertex = None
+        pool_source_vertex: AccountVertex = None
+        for pool in swap_pools:
+            if pool in reachable_from_source and (pool_dest_vertex is None or pool.version > pool_dest_vertex.version):
+                pool_dest_vertex = pool
+            if pool in reaching_dest and (pool_source_vertex is None or pool.version < pool_source_vertex.version):
+                pool_source_vertex = pool
         if (pool_dest_vertex is None) or (pool_source_vertex is None):
             logger.error(f"pool vertices not found for swap {swap.id}, source: {user_source_vertex.address}, destination: {user_dest_vertex.address}, tx: {transaction_context.transaction_signature}")
             return False
@@ -217,11 +228,13 @@ class SwapResolverService:
                 logger.error(f"path user -> pool too short for swap {swap.id}, source: {user_source_vertex.address}, destination: {pool_dest_vertex.address}, tx: {transaction_context.transaction_signature}")
                 return False
             _ , _ , data = transaction_context.graph.get_last_transfer(path_a, subgraph)
-            amount_in = sum(edge_data["amount_destination"] for edge_data in data.values())
+            amount_in = 0
+            for edge_data in data.values():
+                amount_in += edge_data["amount_destination"]
             
             # Create a new transfer key for the swap
             # We take the key of the transfer before the swap, and add 1 to it
-            swap_transfer_key = int(list(data.keys())[0]) + 5
+            swap_transfer_key = int(next(iter(data))) + 5
 
         except nx.NetworkXNoPath:
             # Handle case where path doesn't exist
@@ -236,19 +249,34 @@ class SwapResolverService:
                 logger.error(f"path pool -> user too short for swap {swap.id}, source: {pool_source_vertex.address}, destination: {user_dest_vertex.address}, tx: {transaction_context.transaction_signature}")
                 return False
             _ , _ , data = transaction_context.graph.get_first_transfer(path_b, subgraph)
-            real_swap_amount_out = sum(edge_data["amount_source"] for edge_data in data.values())
+            real_swap_amount_out = 0
+            for edge_data in data.values():
+                real_swap_amount_out += edge_data["amount_source"]
 
             # Calculate amount_out by summing the amount_source of all edges with swap.user_addresses.destination as destination 
             # minus the sum of all edges with swap.user_addresses.destination as source
             # don't count edges where swap.user_addresses.destination is both source and destination
+            # The same pass also collects the lowest and highest keys of the swap's edges
             amount_out = 0
+            min_key = float("inf")
+            max_key = float("-inf")
+            user_destination = swap.user_addresses.destination
             source: AccountVertex
             destination: AccountVertex
-            for source, destination, data in subgraph.edges(data=True):
-                if source.address==swap.user_addresses.destination and destination.address != swap.user_addresses.destination:
-                    amount_out -= data["amount_source"]
-                if destination.address==swap.user_addresses.destination and source.address != swap.user_addresses.destination:
-                    amount_out += data["amount_source"]
+            # Walk the adjacency directly to avoid building a tuple per edge
+            for source, neighbors in subgraph.adj.items():
+                source_address = source.address
+                for destination, edges in neighbors.items():
+                    destination_address = destination.address
+                    for key, data in edges.items():
+                        if key < min_key:
+                            min_key = key
+                        if key > max_key:
+                            max_key = key
+                        if source_address == user_destination and destination_address != user_destination:
+                            amount_out -= data["amount_source"]
+                        elif destination_address == user_destination and source_address != user_destination:
+                            amount_out += data["amount_source"]
                 
 
         except nx.NetworkXNoPath:
@@ -280,11 +308,12 @@ class SwapResolverService:
 
         swap.program_account_vertex = swap_program_account.get_vertex()
 
-        # get lower key of all the swap's edges
-        swap_incoming_transfer_key = min([int(key) for _,_,key in subgraph.edges(keys=True)]) if len(subgraph.edges(keys=True)) > 0 else 0
-
-        # get maximum key of all the swap's edges
-        swap_outgoing_transfer_key = max([int(key) for _,_,key in subgraph.edges(keys=True)]) if len(subgraph.edges(keys=True)) > 0 else 0
+        # get lower and maximum key of all the swap's edges, collected with amount_out
+        if max_key < min_key:
+            # the swap has no edges
+            min_key = max_key = 0
+        swap_incoming_transfer_key = min_key
+        swap_outgoing_transfer_key = max_key
 
         # Add virtual transfer from user source to swap_program_account 
         transaction_context.graph.add_edge(
@@ -320,6 +349,61 @@ class SwapResolverService:
 
         return True
 
+    @staticmethod
+    def _find_router_boundary_edges(
+            graph: TransactionGraph,
+            router_swap_id: int
+            ) -> Tuple[Optional[Tuple[AccountVertex, AccountVertex, int, Dict[str, Any]]], Optional[Tuple[AccountVertex, AccountVertex, int, Dict[str, Any]]]]:
+        """
+        Find the boundary edges of a router swap directly on the transaction graph,
+        without building the router's subgraph.
+
+        Args:
+            graph: The transaction graph
+            router_swap_id: The id of the router swap
+
+        Returns:
+            The SWAP_INCOMING edge with the minimum key and the SWAP_OUTGOING edge
+            with the maximum key among the edges of the router swap, each as a
+            (source, target, key, data) tuple or None if there is no such edge
+        """
+        swap_incoming = _SWAP_INCOMING
+        swap_outgoing = _SWAP_OUTGOING
+        swap_incoming_edge = None
+        swap_outgoing_edge = None
+        min_incoming_key = float("inf")
+        max_outgoing_key = float("-inf")
+        # Edge keys are always ints as they are only created by TransactionGraph.add_edge
+        for u, v, k, data in graph.graph.edges(data=True, keys=True):
+            if data.get("parent_router_swap_id") != router_swap_id:
+                continue
+            transfer_type = data.get("transfer_type")
+            if transfer_type is swap_incoming and k < min_incoming_key:
+                min_incoming_key = k
+                swap_incoming_edge = (u, v, k, data)
+            elif transfer_type is swap_outgoing and k > max_outgoing_key:
+                max_outgoing_key = k
+                swap_outgoing_edge = (u, v, k, data)
+        return swap_incoming_edge, swap_outgoing_edge
+
+    @staticmethod
+    def _earliest_vertex(vertices: List[AccountVertex]) -> Optional[AccountVertex]:
+        """Return the vertex with the lowest version, or None if there are no vertices."""
+        earliest = None
+        for vertex in vertices:
+            if earliest is None or vertex.version < earliest.version:
+                earliest = vertex
+        return earliest
+
+    @staticmethod
+    def _latest_vertex(vertices: List[AccountVertex]) -> Optional[AccountVertex]:
+        """Return the vertex with the highest version, or None if there are no vertices."""
+        latest = None
+        for vertex in vertices:
+            if latest is None or vertex.version > latest.version:
+                latest = vertex
+        return latest
+
     def _calculate_amount_in_from_balance_changes(self, graph: TransactionGraph, swap: Swap) -> int:
         """
         Calculate amount sent to a swap by analyzing balance changes in accounts.
@@ -333,24 +417,28 @@ class SwapResolverService:
         Returns:
             The amount sent to the swap (amount_in)
         """
+        user_source = swap.get_user_source()
+        swap_id = swap.id
+
         # Find all vertices with the user's source address
-        user_source_vertices = graph.get_nodes_by_address(swap.get_user_source())
+        user_source_vertices = graph.get_nodes_by_address(user_source)
         if len(user_source_vertices) < 2:
             return 0
-            
-        # Sort by version and take first and last
-        user_source_vertices.sort(key=lambda v: v.version)
-        first_vertex = user_source_vertices[0]
-        last_vertex = user_source_vertices[-1]
         
         # Calculate balance difference
         amount_in = 0
         
         # Find all outgoing transfer edges from source account to non-source accounts
-        for u, v, k, data in graph.graph.edges(data=True, keys=True):
-            if u.address == swap.get_user_source() and v.address != swap.get_user_source():
-                if data.get("swap_parent_id") == swap.id:
-                    amount_in += data["amount_source"]
+        # Only the adjacency of the source account's vertices is visited
+        for u, neighbors in graph.graph.succ.items():
+            if u.address != user_source:
+                continue
+            for v, edges in neighbors.items():
+                if v.address == user_source:
+                    continue
+                for data in edges.values():
+                    if data.get("swap_parent_id") == swap_id:
+                        amount_in += data["amount_source"]
         
         return amount_in
     
@@ -367,23 +455,27 @@ class SwapResolverService:
         Returns:
             The amount received from the swap (amount_out)
         """
+        user_destination = swap.get_user_destination()
+        swap_id = swap.id
+
         # Find all vertices with the user's destination address
-        user_dest_vertices = graph.get_nodes_by_address(swap.get_user_destination())
+        user_dest_vertices = graph.get_nodes_by_address(user_destination)
         if len(user_dest_vertices) < 2:
             return 0
-            
-        # Sort by version and take first and last
-        user_dest_vertices.sort(key=lambda v: v.version)
-        first_vertex = user_dest_vertices[0]
-        last_vertex = user_dest_vertices[-1]
         
         # Calculate amount out by summing incoming transfers to destination account
         amount_out = 0
         
         # Find all incoming transfer edges to destination account from non-destination accounts
-        for u, v, k, data in graph.graph.edges(data=True, keys=True):
-            if v.address == swap.get_user_destination() and u.address != swap.get_user_destination():
-                if data.get("swap_parent_id") == swap.id:
-                    amount_out += data["amount_destination"]
+        # Only the predecessors of the destination account's vertices are visited
+        for v, predecessors in graph.graph.pred.items():
+            if v.address != user_destination:
+                continue
+            for u, edges in predecessors.items():
+                if u.address == user_destination:
+                    continue
+                for data in edges.values():
+                    if data.get("swap_parent_id") == swap_id:
+                        amount_out += data["amount_destination"]
         
         return amount_out
\ No newline at end of file